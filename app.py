@@ -1,28 +1,35 @@
 import streamlit as st
 import asyncio
-import os
-import tempfile
+import html
 import traceback
-import sys
-from brand_extractor import BrandExtractor
-import asyncio.exceptions
-import signal
-from concurrent.futures import TimeoutError
+from app_helpers import (URL_PATTERN, ExtractionError, ProgressThrottle, canonical_url,
+                         extract_report, get_resources, publish_pdf)
 
 # Enable debug mode
 st.set_page_config(page_title="Brand Extractor", layout="centered")
 st.set_option('client.showErrorDetails', True)
 
-# Create a temporary directory for reports
-temp_dir = tempfile.mkdtemp()
+# Install the browser and start the workers before the first click
+try:
+    get_resources()
+except RuntimeError as e:
+    st.error(f"Playwright installation failed: {e}")
+    st.stop()
+
 if 'processing' not in st.session_state:
     st.session_state.processing = False
 
 st.title("🌐 Brand Style Guide Extractor")
 st.write("Enter a website URL to analyze and download a PDF branding report with colors, fonts, and logos.")
 
-# Add debug mode toggle
-debug_mode = st.sidebar.checkbox("Debug Mode", value=True)
+# Add debug mode toggle, off by default so normal runs skip the debug output
+debug_mode = st.sidebar.checkbox("Debug Mode", value=False)
+
+def show_traceback():
+    """Render the current exception's traceback in debug mode"""
+    if debug_mode:
+        st.write("Full error traceback:")
+        st.code(traceback.format_exc())
 
 url = st.text_input("Website URL", placeholder="https://www.example.com")
 
@@ -33,110 +40,65 @@ if col1.button("Generate Report", disabled=st.session_state.processing) and url:
     st.session_state.processing = True
     progress_text = st.empty()
     progress_bar = st.progress(0)
+    progress = ProgressThrottle(progress_bar, progress_text)
     
     try:
-        async def run_extractor():
+        def run_extractor():
             try:
-                progress_text.text("Setting up browser...")
-                progress_bar.progress(10)
-                
-                # Install Playwright browsers if not already installed
-                if not os.path.exists(os.path.expanduser("~/.cache/ms-playwright")):
-                    progress_text.text("Installing required browsers...")
-                    import subprocess
-                    result = subprocess.run(["playwright", "install", "chromium"], 
-                                         capture_output=True, text=True)
-                    if debug_mode:
-                        st.write(f"Debug: Playwright install output: {result.stdout}")
-                        if result.stderr:
-                            st.write(f"Debug: Playwright install errors: {result.stderr}")
-                    if result.returncode != 0:
-                        st.error(f"Playwright installation failed: {result.stderr}")
-                        return None
-                
-                progress_text.text("Creating extractor instance...")
-                progress_bar.progress(20)
-                
                 # Validate URL format
-                if not url.startswith(('http://', 'https://')):
-                    st.error("❌ URL must start with http:// or https://")
+                if not URL_PATTERN.match(url.strip()):
+                    st.error("❌ URL must start with http:// or https:// followed by a host name")
                     return None
                 
-                extractor = BrandExtractor(url, output_dir=temp_dir, auto_open=False, debug=debug_mode)
-                
-                progress_text.text("Starting website analysis...")
-                progress_bar.progress(30)
+                progress.set(30, "Starting website analysis...")
                 
                 # Set a timeout for the extraction process
                 try:
-                    result = await asyncio.wait_for(extractor.extract_branding(), timeout=30)
-                    if debug_mode:
-                        st.write(f"Debug: Raw extraction result: {result}")
-                        
-                    if not result:
-                        st.error("❌ Extraction failed - no result returned")
-                        return None
-                        
+                    report = extract_report(canonical_url(url), url.strip(), _debug=debug_mode)
                 except asyncio.TimeoutError:
                     st.error("❌ The analysis took too long to complete. Please try again or try a different URL.")
                     return None
+                except ExtractionError as e:
+                    st.error(f"❌ {str(e)}")
+                    return None
                 except Exception as e:
                     st.error(f"❌ Error during extraction: {str(e)}")
-                    if debug_mode:
-                        st.write("Full error traceback:")
-                        st.code(traceback.format_exc())
+                    show_traceback()
                     return None
                 
-                progress_bar.progress(90)
-                progress_text.text("Finalizing report...")
+                progress.set(90, "Finalizing report...")
                 
-                if result and 'pdf' in result:
-                    if debug_mode:
-                        st.write(f"Debug: PDF path: {result['pdf']}")
-                        st.write(f"Debug: File exists: {os.path.exists(result['pdf'])}")
-                        st.write(f"Debug: File size: {os.path.getsize(result['pdf']) if os.path.exists(result['pdf']) else 'N/A'}")
-                    
-                    if not os.path.exists(result['pdf']):
-                        st.error("❌ PDF file was not created")
-                        return None
-                        
-                    progress_bar.progress(100)
-                    progress_text.text("Report generated successfully!")
-                    return result['pdf']
-                else:
-                    if debug_mode:
-                        st.error(f"Debug: Result object: {result}")
-                    st.error("❌ No PDF generated in the result")
-                    return None
+                if debug_mode:
+                    st.write(f"Debug: PDF name: {report['pdf_name']}")
+                    st.write(f"Debug: PDF size: {len(report['pdf_bytes'])}")
+                
+                progress.set(100, "Report generated successfully!")
+                return report
                     
             except Exception as e:
                 st.error(f"❌ Extraction error: {str(e)}")
-                if debug_mode:
-                    st.write("Full error traceback:")
-                    st.code(traceback.format_exc())
+                show_traceback()
                 return None
             finally:
                 st.session_state.processing = False
 
-        pdf_path = asyncio.run(run_extractor())
+        report = run_extractor()
 
-        if pdf_path and os.path.exists(pdf_path):
+        if report:
             st.success("✅ Report generated successfully!")
-            with open(pdf_path, "rb") as f:
-                st.download_button(
-                    label="📄 Download PDF Report",
-                    data=f,
-                    file_name=os.path.basename(pdf_path),
-                    mime="application/pdf"
-                )
+            # Link to the file instead of pushing the bytes through the websocket
+            pdf_url = publish_pdf(report['pdf_bytes'])
+            st.markdown(
+                f'<a href="{pdf_url}" download="{html.escape(report["pdf_name"])}">📄 Download PDF Report</a>',
+                unsafe_allow_html=True
+            )
         else:
             st.error("❌ Failed to generate the report. Try another URL.")
             st.info("Please make sure the URL is accessible and includes the protocol (http:// or https://)")
             
     except Exception as e:
         st.error(f"❌ An error occurred: {str(e)}")
-        if debug_mode:
-            st.code(traceback.format_exc())
+        show_traceback()
         st.info("Please try again with a different URL or contact support if the issue persists.")
     finally:
         # Clear progress indicators if they exist
@@ -0,0 +1,169 @@
+"""Process-wide resources and helpers for app.py, imported once instead of re-run on every rerun"""
+import streamlit as st
+import asyncio
+import atexit
+import concurrent.futures
+import hashlib
+import multiprocessing
+import os
+import pathlib
+import re
+import shutil
+import tempfile
+import threading
+import time
+import types
+from urllib.parse import urlparse, urlsplit, urlunsplit, parse_qsl, urlencode
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from brand_extractor import ensure_playwright, extract_in_worker, init_worker
+
+# Worker processes, each holding its own warm Chromium
+EXTRACTION_WORKERS = min(4, os.cpu_count() or 1)
+
+def create_worker_pool():
+    """Start the worker processes that run extractions away from the Streamlit process"""
+    # Spawn rather than fork, the Streamlit process already runs several threads
+    pool = ProcessPoolExecutor(max_workers=EXTRACTION_WORKERS,
+                               mp_context=multiprocessing.get_context("spawn"),
+                               initializer=init_worker)
+    # Each submit starts one more worker, so every browser launches up front
+    for _ in range(EXTRACTION_WORKERS):
+        pool.submit(os.getpid)
+    return pool
+
+@st.cache_resource(show_spinner="Starting browser workers...")
+def get_resources():
+    """Install Chromium if needed and start the worker pool once per server process"""
+    asyncio.run(ensure_playwright())
+    resources = types.SimpleNamespace(pool=create_worker_pool(), lock=threading.Lock())
+    atexit.register(lambda: resources.pool.shutdown(cancel_futures=True))
+    return resources
+
+def restart_worker_pool(broken_pool):
+    """Replace a pool whose worker died, unless another session already did"""
+    resources = get_resources()
+    with resources.lock:
+        if resources.pool is broken_pool:
+            broken_pool.shutdown(wait=False, cancel_futures=True)
+            resources.pool = create_worker_pool()
+
+# Hard upper bound for one extraction, in seconds
+EXTRACTION_TIMEOUT = 30
+# Extra time the session waits beyond the worker's own timeout before giving up on it
+RESULT_TIMEOUT_MARGIN = 15
+
+# How long a host stays on the plain-HTTP fast path after a successful browser run
+DOMAIN_SKILL_TTL = 86400
+
+@st.cache_resource
+def get_domain_skills():
+    """Hosts whose branding was extracted successfully, mapped to the time of that run"""
+    return {}
+
+class ProgressThrottle:
+    """Forward progress updates to Streamlit at most `hz` times per second"""
+
+    def __init__(self, bar, text, hz=10):
+        self.bar = bar
+        self.text = text
+        self.min_interval = 1 / hz
+        self.last_update = 0
+
+    def set(self, percent, message):
+        # The final update is always shown
+        now = time.monotonic()
+        if percent < 100 and now - self.last_update < self.min_interval:
+            return
+        self.last_update = now
+        self.bar.progress(percent)
+        self.text.text(message)
+
+# http(s) URL with a host and no whitespace, compiled once per process
+URL_PATTERN = re.compile(r'^https?://[^\s/$.?#][^\s]*$', re.IGNORECASE)
+
+class ExtractionError(Exception):
+    """The extraction finished without producing a PDF report"""
+
+def canonical_url(url):
+    """Normalize a URL so equivalent spellings share one cached report"""
+    parts = urlsplit(url.strip())
+    query = urlencode([(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+                       if not key.lower().startswith('utm_')])
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip('/'), query, ''))
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def extract_report(cache_key, _page_url, _debug=False):
+    """Extract the branding report for a URL, cached per canonical URL for an hour"""
+    # cache_key is canonical_url(_page_url); the page itself is fetched exactly as entered
+    # so relative stylesheet and logo links resolve against the real path
+    host = urlparse(cache_key).netloc
+    fast_path = time.time() - get_domain_skills().get(host, 0) < DOMAIN_SKILL_TTL
+
+    pool = get_resources().pool
+    try:
+        future = pool.submit(extract_in_worker, _page_url, new_report_dir(), _debug, fast_path, EXTRACTION_TIMEOUT)
+        # Streamlit only stops a script run inside st.* calls, so a rerun or Cancel never
+        # interrupts this wait; the timeout is what bounds it
+        try:
+            result = future.result(timeout=EXTRACTION_TIMEOUT + RESULT_TIMEOUT_MARGIN)
+        except concurrent.futures.TimeoutError:
+            # Drops the job if it has not started, a running one ends at the worker's timeout
+            future.cancel()
+            raise asyncio.TimeoutError()
+    except BrokenProcessPool:
+        restart_worker_pool(pool)
+        raise ExtractionError("The browser worker crashed - please try again")
+    if not result:
+        raise ExtractionError("Extraction failed - no result returned")
+    if not result.get('pdf_bytes'):
+        raise ExtractionError("PDF file was not created")
+
+    get_domain_skills()[host] = time.time()
+    # Keep the bytes, not the path, so cache hits survive report directory cleanup
+    return {'pdf_name': os.path.basename(result['pdf']), 'pdf_bytes': result['pdf_bytes']}
+
+# Report directories older than this are removed on the next run
+REPORT_MAX_AGE = 3600
+
+@st.cache_resource
+def get_reports_root():
+    """Create one temporary directory for reports, removed when the process exits"""
+    root = tempfile.mkdtemp(prefix="brand_")
+    atexit.register(shutil.rmtree, root, ignore_errors=True)
+    return root
+
+def remove_older_than(directory, max_age):
+    """Delete files and directories in `directory` not modified for `max_age` seconds"""
+    cutoff = time.time() - max_age
+    for entry in os.scandir(directory):
+        try:
+            if entry.stat().st_mtime < cutoff:
+                if entry.is_dir():
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                else:
+                    os.remove(entry.path)
+        except OSError:
+            pass
+
+def new_report_dir():
+    """Create a directory for one run and drop the ones left over from old runs"""
+    root = get_reports_root()
+    remove_older_than(root, REPORT_MAX_AGE)
+    return tempfile.mkdtemp(dir=root)
+
+# Streamlit serves this directory at app/static/ (server.enableStaticServing)
+STATIC_DIR = pathlib.Path(__file__).parent / "static"
+
+# Published PDFs older than this are removed on the next publish
+STATIC_MAX_AGE = 86400
+
+def publish_pdf(pdf_bytes):
+    """Store the PDF under its content hash in the static directory and return its URL"""
+    digest = hashlib.blake2b(pdf_bytes, digest_size=16).hexdigest()
+    path = STATIC_DIR / f"{digest}.pdf"
+    STATIC_DIR.mkdir(exist_ok=True)
+    remove_older_than(STATIC_DIR, STATIC_MAX_AGE)
+    if not path.exists():
+        path.write_bytes(pdf_bytes)
+    return f"app/static/{digest}.pdf"
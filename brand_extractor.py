@@ -1,7 +1,8 @@
 import asyncio
-from playwright.async_api import async_playwright
-from bs4 import BeautifulSoup
-import requests
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+from selectolax.lexbor import LexborHTMLParser
+import httpx
+import orjson
 import re
 from collections import Counter
 import os
@@ -11,19 +12,267 @@ from reportlab.lib.pagesizes import letter
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak, Image
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
+from PIL import Image as PILImage
 import argparse
+import atexit
+import hashlib
+import importlib.metadata
+import io
+import pathlib
+import shutil
 import sys
-import json
+import tempfile
+import time
 import webbrowser
 import traceback
+import types
+from urllib.parse import urljoin, urlparse
+
+# Chromium flags used for every launch, shared with callers that pool a browser
+BROWSER_ARGS = [
+    '--disable-gpu',
+    '--no-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-web-security',
+    '--disable-features=IsolateOrigins,site-per-process',
+    '--ignore-certificate-errors',
+    '--disable-setuid-sandbox',
+    '--disable-software-rasterizer',
+    '--disable-accelerated-2d-canvas',
+    '--no-first-run'
+]
+
+# Browser identity for the page load and every asset download
+USER_AGENT = 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# Logos are downsampled to fit this many pixels per side before embedding
+LOGO_MAX_PX = 512
+
+# Width of the swatch column in the PDF color tables
+SWATCH_WIDTH = 0.6 * inch
+
+# Style analysis patterns, compiled once at import
+ROOT_BLOCK_RE = re.compile(r':root\s*\{([^}]*)\}')
+ROOT_VAR_RE = re.compile(r'--(.*?):\s*(.*?);')
+# Fonts, hex colors and rgb()/rgba() colors in one alternation. The font value is
+# captured in a lookahead so colors inside an unterminated declaration still match.
+# Groups 4-6 hold the rgb() channels, 7-9 the rgba() ones.
+STYLE_TOKEN_RE = re.compile(
+    r'font-family:(?=\s*(?P<font>[^;]+))'
+    r'|#(?P<hex>[0-9a-fA-F]{3,6})'
+    r'|(?P<rgb>rgb\((\d+),\s*(\d+),\s*(\d+)\)|rgba\((\d+),\s*(\d+),\s*(\d+),\s*[0-9.]+\))'
+)
+
+# Largest prefix of an external stylesheet that is downloaded and analyzed
+STYLESHEET_MAX_BYTES = 512 * 1024
+
+# Read size used when streaming downloads to disk
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+# Downloaded logos stay in memory up to this size before spilling to a temporary file
+LOGO_SPOOL_BYTES = 1024 * 1024
+
+# Number of elements whose computed styles are sampled per page
+COMPUTED_STYLE_LIMIT = 20
+
+# Keywords and generic families that say nothing about the brand, plus empty list entries
+GENERIC_FONTS = frozenset({'inherit', 'initial', 'unset', 'serif', 'sans-serif', 'monospace', 'cursive', 'fantasy', ''})
+
+# Upper bound on concurrent stylesheet/logo downloads per extraction
+MAX_CONCURRENT_FETCHES = 8
+
+# Resource types the extractor never reads, the logo is downloaded separately by URL
+BLOCKED_RESOURCE_TYPES = frozenset({'image', 'media', 'font', 'websocket', 'other'})
+
+async def _block_unneeded_resources(route):
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+# Downloaded stylesheets are reused across extractions for this long
+CSS_CACHE_DIR = pathlib.Path("~/.cache/brand_extractor/css").expanduser()
+CSS_CACHE_MAX_AGE = 86400
+# Cache-busting query strings make most URLs one-offs, so the cache keeps at most this many files
+CSS_CACHE_MAX_FILES = 500
+
+def _css_cache_path(url):
+    return CSS_CACHE_DIR / f"{hashlib.sha1(url.encode()).hexdigest()}.css"
+
+def read_cached_css(url):
+    """Return the cached stylesheet for url, or None if it is missing or expired"""
+    path = _css_cache_path(url)
+    try:
+        if time.time() - path.stat().st_mtime < CSS_CACHE_MAX_AGE:
+            return path.read_text(encoding='utf-8')
+    except OSError:
+        pass
+    return None
+
+def write_cached_css(url, css):
+    """Store a stylesheet in the cache, a failed write only costs the next download"""
+    path = _css_cache_path(url)
+    try:
+        CSS_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # Write then rename so concurrent writers never leave a partial file behind
+        fd, tmp_path = tempfile.mkstemp(dir=CSS_CACHE_DIR, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(css)
+        os.replace(tmp_path, path)
+        _evict_css_cache()
+    except OSError:
+        pass
+
+def _evict_css_cache():
+    """Delete expired entries, then the oldest ones beyond CSS_CACHE_MAX_FILES"""
+    cutoff = time.time() - CSS_CACHE_MAX_AGE
+    entries = []
+    for entry in os.scandir(CSS_CACHE_DIR):
+        try:
+            mtime = entry.stat().st_mtime
+            # Leftover temp files of crashed writers expire like entries, live ones are young
+            if mtime < cutoff:
+                os.remove(entry.path)
+            elif entry.name.endswith('.css'):
+                entries.append((mtime, entry.path))
+        except OSError:
+            pass
+    if len(entries) > CSS_CACHE_MAX_FILES:
+        entries.sort()
+        for _, path in entries[:len(entries) - CSS_CACHE_MAX_FILES]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+def _save_spool(spool, path):
+    """Copy a spooled download to path and release the spool"""
+    with spool:
+        spool.seek(0)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            shutil.copyfileobj(spool, f)
+
+async def run_playwright_cli(*args):
+    """Run a playwright CLI command without blocking the event loop"""
+    process = await asyncio.create_subprocess_exec(
+        "playwright", *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    stdout, stderr = await process.communicate()
+    if process.returncode != 0:
+        raise RuntimeError(f"playwright {' '.join(args)} failed: {stderr.decode(errors='replace')}")
+    return stdout.decode(errors='replace')
+
+# Records the Playwright version whose Chromium build was last installed
+PLAYWRIGHT_SENTINEL = pathlib.Path("~/.cache/brand_extractor/.pw_installed").expanduser()
+
+async def ensure_playwright(log=None, with_deps=False):
+    """Install Chromium unless the sentinel matches the Playwright version and Chromium is present"""
+    wanted = importlib.metadata.version("playwright")
+    # The sentinel alone is not enough, the browsers directory may have been wiped since
+    browsers_path = pathlib.Path(os.environ.get("PLAYWRIGHT_BROWSERS_PATH", "~/.cache/ms-playwright")).expanduser()
+    try:
+        if PLAYWRIGHT_SENTINEL.read_text() == wanted and any(browsers_path.glob("chromium-*")):
+            return
+    except OSError:
+        pass
+    if with_deps:
+        try:
+            if log:
+                log("Installing browser dependencies...")
+            await run_playwright_cli("install-deps", "chromium")
+        except RuntimeError as e:
+            # Usually needs root, the libraries may already be present
+            if log:
+                log(f"Browser dependency installation note: {str(e)}")
+    if log:
+        log("Installing browser...")
+    await run_playwright_cli("install", "chromium")
+    PLAYWRIGHT_SENTINEL.parent.mkdir(parents=True, exist_ok=True)
+    PLAYWRIGHT_SENTINEL.write_text(wanted)
+
+_browser_installed = False
+_browser_install_lock = None
+
+async def ensure_browser_installed(log):
+    """Check the Chromium install at most once per process"""
+    global _browser_installed, _browser_install_lock
+    if _browser_installed:
+        return
+    if _browser_install_lock is None:
+        _browser_install_lock = asyncio.Lock()
+    async with _browser_install_lock:
+        if _browser_installed:
+            return
+        try:
+            await ensure_playwright(log, with_deps=True)
+        except Exception as e:
+            log(f"Browser installation note: {str(e)}")
+        # A failed install is not retried, launching the browser reports the real error
+        _browser_installed = True
+
+def create_http_client():
+    """Create the pooled HTTP/2 client used for stylesheet and logo downloads"""
+    # Certificate errors are ignored just like in the browser context. Accept-Encoding is
+    # left to httpx, which offers br alongside gzip and deflate when brotli is installed.
+    return httpx.AsyncClient(
+        http2=True,
+        verify=False,
+        follow_redirects=True,
+        timeout=10,
+        headers={'User-Agent': USER_AGENT},
+        limits=httpx.Limits(max_keepalive_connections=64, max_connections=128)
+    )
+
+class _BrowserPool:
+    """Chromium started on first use and shared by every extraction on one event loop"""
+
+    def __init__(self):
+        self._loop = None
+        self._lock = None
+        self._playwright = None
+        self._browser = None
+
+    async def get(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Playwright objects are bound to the loop that created them
+            self._loop = loop
+            self._lock = asyncio.Lock()
+            self._playwright = self._browser = None
+        async with self._lock:
+            if self._browser is None or not self._browser.is_connected():
+                if self._playwright is None:
+                    self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(headless=True, args=BROWSER_ARGS)
+        return self._browser
+
+    async def close(self):
+        try:
+            if self._browser is not None:
+                await self._browser.close()
+            if self._playwright is not None:
+                await self._playwright.stop()
+        except Exception:
+            pass
+        self._playwright = self._browser = None
+
+_browser_pool = _BrowserPool()
 
 class BrandExtractor:
-    def __init__(self, url, output_dir='reports', auto_open=False, debug=False):
+    def __init__(self, url, output_dir='reports', auto_open=False, debug=False, browser=None,
+                 precomputed_html=None, http_client=None, precomputed_url=None):
         self.url = url
         self.output_dir = output_dir
         self.auto_open = auto_open
         self.debug = debug
-        self.soup = None
+        self.browser = browser
+        self.precomputed_html = precomputed_html
+        # Final URL of precomputed_html after redirects, the base for its relative links
+        self.precomputed_url = precomputed_url or url
+        self._http = http_client
+        self._fetch_semaphore = asyncio.Semaphore(MAX_CONCURRENT_FETCHES)
         self.styles = {}
         self.css_variables = {}
         self.fonts = set()
@@ -32,6 +281,11 @@ class BrandExtractor:
         self.font_frequency = Counter()
         self.color_frequency = Counter()
         self.logo_path = None
+        self._logo_task = None
+        self.pdf_bytes = None
+        self._analyzed = False
+        self._sorted_fonts = []
+        self._sorted_colors = []
 
     def log(self, message):
         """Print debug messages if debug mode is enabled"""
@@ -39,6 +293,19 @@ class BrandExtractor:
             print(f"DEBUG: {message}")
 
     async def fetch_page(self):
+        if self.precomputed_html:
+            try:
+                if await self._load_html(self.precomputed_html, self.precomputed_url):
+                    return True
+                self.log("No styles found in raw HTML, falling back to browser")
+            except Exception as e:
+                self.log(f"Error processing raw HTML: {str(e)}")
+            self.styles = {}
+        
+        # An injected browser is already running, otherwise install once before retrying
+        if self.browser is None:
+            await ensure_browser_installed(self.log)
+        
         max_retries = 2
         current_retry = 0
         
@@ -46,104 +313,12 @@ class BrandExtractor:
             try:
                 self.log(f"Attempt {current_retry + 1} of {max_retries + 1}")
                 
-                # Try to install browser first
-                try:
-                    import subprocess
-                    self.log("Installing browser dependencies...")
-                    subprocess.run(["playwright", "install-deps", "chromium"], 
-                                capture_output=True, text=True, check=True)
-                    self.log("Installing browser...")
-                    subprocess.run(["playwright", "install", "chromium"], 
-                                capture_output=True, text=True, check=True)
-                except Exception as e:
-                    self.log(f"Browser installation note: {str(e)}")
-                
-                async with async_playwright() as playwright:
-                    self.log("Launching browser...")
-                    browser = await playwright.chromium.launch(
-                        headless=True,
-                        args=[
-                            '--disable-gpu',
-                            '--no-sandbox',
-                            '--disable-dev-shm-usage',
-                            '--disable-web-security',
-                            '--disable-features=IsolateOrigins,site-per-process',
-                            '--ignore-certificate-errors',
-                            '--disable-setuid-sandbox',
-                            '--disable-software-rasterizer',
-                            '--disable-accelerated-2d-canvas',
-                            '--no-first-run',
-                            '--no-zygote',
-                            '--single-process',
-                            '--disable-dev-tools'
-                        ]
-                    )
-                    
-                    self.log("Creating browser context...")
-                    context = await browser.new_context(
-                        viewport={'width': 1280, 'height': 720},
-                        ignore_https_errors=True,
-                        user_agent='Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-                    )
-                    
-                    self.log("Creating new page...")
-                    page = await context.new_page()
-                    
-                    try:
-                        self.log(f"Navigating to {self.url}...")
-                        response = await page.goto(
-                            self.url,
-                            wait_until='domcontentloaded',
-                            timeout=20000  # 20 seconds timeout
-                        )
-                        
-                        if not response:
-                            raise Exception("No response received from page")
-                            
-                        if not response.ok:
-                            if response.status == 404:
-                                raise Exception(f"Page not found (404)")
-                            elif response.status == 403:
-                                raise Exception(f"Access forbidden (403)")
-                            else:
-                                raise Exception(f"HTTP {response.status} received")
-                        
-                        self.log("Waiting for page content...")
-                        await page.wait_for_selector('body', timeout=5000)
-                        
-                        self.log("Getting page content...")
-                        content = await page.content()
-                        if not content:
-                            raise Exception("No content received from page")
-                            
-                        self.soup = BeautifulSoup(content, 'lxml')
-                        
-                        self.log("Extracting CSS...")
-                        await self.extract_css(page)
-                        
-                        self.log("Looking for logo...")
-                        await self._extract_logo(page)
-                        
-                        self.log("Closing browser...")
-                        await browser.close()
-                        
-                        return True
-                        
-                    except Exception as e:
-                        self.log(f"Error during page processing: {str(e)}")
-                        if current_retry == max_retries:
-                            return False
-                        current_retry += 1
-                        await asyncio.sleep(2)
-                        continue
-                    finally:
-                        try:
-                            await browser.close()
-                        except:
-                            pass
+                # Only a fresh context is created per attempt, the browser is reused
+                await self._load_page(self.browser or await _browser_pool.get())
+                return True
                             
             except Exception as e:
-                self.log(f"Critical error: {str(e)}")
+                self.log(f"Error during page processing: {str(e)}")
                 if current_retry == max_retries:
                     return False
                 current_retry += 1
@@ -152,6 +327,84 @@ class BrandExtractor:
                     
         return False
 
+    async def _load_page(self, browser):
+        """Load the page in a new browser context and extract its CSS and logo"""
+        self.log("Creating browser context...")
+        context = await browser.new_context(
+            viewport={'width': 1280, 'height': 720},
+            ignore_https_errors=True,
+            user_agent=USER_AGENT
+        )
+        
+        try:
+            await context.route("**/*", _block_unneeded_resources)
+            
+            self.log("Creating new page...")
+            page = await context.new_page()
+            
+            self.log(f"Navigating to {self.url}...")
+            response = await page.goto(
+                self.url,
+                wait_until='domcontentloaded',
+                timeout=15000  # 15 seconds timeout
+            )
+            
+            if not response:
+                raise Exception("No response received from page")
+                
+            if not response.ok:
+                if response.status == 404:
+                    raise Exception(f"Page not found (404)")
+                elif response.status == 403:
+                    raise Exception(f"Access forbidden (403)")
+                else:
+                    raise Exception(f"HTTP {response.status} received")
+            
+            # Let scripts inject their stylesheets, but never wait longer than 5 seconds
+            self.log("Waiting for network to settle...")
+            try:
+                await page.wait_for_load_state('networkidle', timeout=5000)
+            except PlaywrightTimeoutError:
+                self.log("Network still busy, continuing with the loaded content")
+            
+            # CSS and the logo are read from the live DOM, so the serialized HTML is never
+            # fetched or parsed here. Both steps are independent and run concurrently.
+            self.log("Extracting CSS and looking for logo...")
+            await asyncio.gather(
+                self.extract_css(page),
+                self._extract_logo(page)
+            )
+        finally:
+            try:
+                await context.close()
+            except:
+                pass
+
+    async def _load_html(self, content, base_url):
+        """Extract CSS and logo from already fetched HTML without rendering it"""
+        # Only a handful of selector lookups are needed, the tree is not kept on the instance
+        tree = LexborHTMLParser(content)
+        
+        for i, style in enumerate(tree.css('style')):
+            self.styles[f'inline_style_{i}'] = style.text()
+        
+        inline_attrs = [el.attributes['style'] for el in tree.css('[style]') if el.attributes['style']]
+        if inline_attrs:
+            self.styles['inline_attributes'] = ' '.join(inline_attrs)
+        
+        # The logo downloads in the background while the stylesheets are fetched
+        external_stylesheets = [urljoin(base_url, link.attributes['href'])
+                                for link in tree.css('link[rel~="stylesheet"][href]')
+                                if link.attributes['href']]
+        logo_element = (tree.css_first("img[alt*='logo' i], img[src*='logo' i]")
+                        or tree.css_first(".logo img, .site-logo img, #logo img"))
+        if logo_element and logo_element.attributes.get('src'):
+            self._start_logo_download(urljoin(base_url, logo_element.attributes['src']))
+        await self._fetch_stylesheets(external_stylesheets)
+        
+        self.log(f"Found {len(self.styles)} style sources in raw HTML")
+        return bool(self.styles)
+
     async def _extract_logo(self, page):
         """Helper method to extract logo with retry logic"""
         try:
@@ -166,112 +419,119 @@ class BrandExtractor:
             if logo_element:
                 logo_url = await logo_element.get_attribute('src')
                 if logo_url:
-                    if logo_url.startswith('//'):
-                        logo_url = 'https:' + logo_url
-                    elif logo_url.startswith('/'):
-                        logo_url = self.url.rstrip('/') + logo_url
-                    elif not logo_url.startswith('http'):
-                        logo_url = self.url.rstrip('/') + '/' + logo_url
-                        
-                    try:
-                        logo_response = requests.get(logo_url, timeout=10, verify=False)
-                        if logo_response.status_code == 200:
-                            os.makedirs(self.output_dir, exist_ok=True)
-                            logo_path = os.path.join(self.output_dir, 'logo.png')
-                            with open(logo_path, 'wb') as f:
-                                f.write(logo_response.content)
-                            self.logo_path = logo_path
-                    except Exception as e:
-                        self.log(f"Error downloading logo: {str(e)}")
+                    # page.url is where the browser ended up after redirects
+                    self._start_logo_download(urljoin(page.url, logo_url))
                         
         except Exception as e:
             self.log(f"Error extracting logo: {str(e)}")
 
+    def _start_logo_download(self, logo_url):
+        """Download the logo in the background, replacing any download still running"""
+        if self._logo_task and not self._logo_task.done():
+            self._logo_task.cancel()
+        self._logo_task = asyncio.create_task(self._download_logo(logo_url))
+
+    async def _download_logo(self, logo_url):
+        try:
+            async with self._fetch_semaphore, self._http.stream('GET', logo_url) as logo_response:
+                if logo_response.status_code != 200:
+                    return
+                # Chunks collect in a spool that stays in memory for any normal logo, then the
+                # file is created, written and closed in a single worker-thread hop
+                logo_path = os.path.join(self.output_dir, 'logo.png')
+                spool = tempfile.SpooledTemporaryFile(max_size=LOGO_SPOOL_BYTES)
+                async for chunk in logo_response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                    spool.write(chunk)
+                await asyncio.to_thread(_save_spool, spool, logo_path)
+                self.logo_path = logo_path
+        except Exception as e:
+            self.log(f"Error downloading logo: {str(e)}")
+
+    async def _fetch_stylesheets(self, stylesheet_urls):
+        async def fetch(stylesheet_url):
+            try:
+                cached = await asyncio.to_thread(read_cached_css, stylesheet_url)
+                if cached is not None:
+                    return cached
+                async with self._fetch_semaphore, self._http.stream('GET', stylesheet_url) as response:
+                    # Same-origin sheets share one connection when HTTP/2 is negotiated
+                    self.log(f"Stylesheet {stylesheet_url} served over {response.http_version}")
+                    if response.status_code != 200 or 'css' not in response.headers.get('content-type', ''):
+                        return None
+                    # Stop reading once the cap is hit, huge bundles are mostly utility classes
+                    body = bytearray()
+                    async for chunk in response.aiter_bytes():
+                        body += chunk
+                        if len(body) >= STYLESHEET_MAX_BYTES:
+                            self.log(f"Truncating large stylesheet {stylesheet_url}")
+                            break
+                css = bytes(body[:STYLESHEET_MAX_BYTES]).decode(response.encoding or 'utf-8', 'ignore')
+                await asyncio.to_thread(write_cached_css, stylesheet_url, css)
+                return css
+            except Exception as e:
+                self.log(f"Error fetching external stylesheet {stylesheet_url}: {e}")
+                return None
+
+        # Insert in document order, not completion order: later :root variables win in
+        # analyze_styles, so the order has to be the same on every run
+        results = await asyncio.gather(*(fetch(u) for u in stylesheet_urls))
+        for i, css in enumerate(results):
+            if css is not None:
+                self.styles[f'external_style_{i}'] = css
+
     async def extract_css(self, page):
         try:
-            # Extract inline styles
-            inline_styles = await page.evaluate('''
-                () => {
-                    const styles = [];
-                    const styleElements = document.querySelectorAll('style');
-                    styleElements.forEach(style => {
-                        styles.push({
-                            type: 'inline',
-                            content: style.textContent
-                        });
+            # Collect every style source in a single round-trip to the browser
+            sources = await page.evaluate('''
+                (limit) => {
+                    // getComputedStyle is the slowest part, so only sample the first few elements
+                    const elements = Array.from(document.querySelectorAll('body, h1, h2, h3, p, a, button, .logo, .header, .footer, .nav, .main, .container')).slice(0, limit);
+                    // One array per property instead of repeating the property names per element.
+                    // Only text and background colors and fonts are sampled; colors that appear solely
+                    // as computed border colors no longer reach the report.
+                    const computed = {selectors: [], 'color': [], 'background-color': [], 'font-family': []};
+                    elements.forEach((el, index) => {
+                        const style = window.getComputedStyle(el);
+                        computed.selectors.push(el.tagName.toLowerCase() + '_' + index);
+                        computed['color'].push(style.color);
+                        computed['background-color'].push(style.backgroundColor);
+                        computed['font-family'].push(style.fontFamily);
                     });
-                    return styles;
-                }
-            ''')
-            
-            for i, style in enumerate(inline_styles):
-                self.styles[f'inline_style_{i}'] = style['content']
-            
-            # Extract external stylesheets
-            external_stylesheets = await page.evaluate('''
-                () => {
-                    const links = [];
-                    const linkElements = document.querySelectorAll('link[rel="stylesheet"]');
-                    linkElements.forEach(link => {
-                        if (link.href) {
-                            links.push(link.href);
+                    // Style tags, stylesheet links and style attributes in one DOM walk. localName
+                    // rather than tagName, which stays lowercase for SVG and XHTML elements.
+                    const inline = [], external = [], attrs = [];
+                    document.querySelectorAll('style, link[rel="stylesheet"], [style]').forEach(el => {
+                        if (el.localName === 'style') {
+                            inline.push(el.textContent);
+                        } else if (el.localName === 'link' && el.href && el.matches('[rel="stylesheet"]')) {
+                            external.push(el.href);
+                        }
+                        if (el.hasAttribute('style')) {
+                            attrs.push(el.getAttribute('style'));
                         }
                     });
-                    return links;
+                    return {inline, external, attrs, computed};
                 }
-            ''')
+            ''', COMPUTED_STYLE_LIMIT)
             
-            for i, stylesheet_url in enumerate(external_stylesheets):
-                try:
-                    response = requests.get(stylesheet_url, timeout=10)
-                    if response.status_code == 200:
-                        self.styles[f'external_style_{i}'] = response.text
-                except Exception as e:
-                    self.log(f"Error fetching external stylesheet {stylesheet_url}: {e}")
+            # Extract inline styles
+            for i, content in enumerate(sources['inline']):
+                self.styles[f'inline_style_{i}'] = content
             
-            # Extract inline style attributes
-            inline_attrs = await page.evaluate('''
-                () => {
-                    const elements = document.querySelectorAll('[style]');
-                    const styles = [];
-                    elements.forEach(el => {
-                        styles.push(el.getAttribute('style'));
-                    });
-                    return styles;
-                }
-            ''')
+            # Extract external stylesheets
+            await self._fetch_stylesheets(sources['external'])
             
-            if inline_attrs:
-                self.styles['inline_attributes'] = ' '.join(inline_attrs)
+            # Extract inline style attributes
+            if sources['attrs']:
+                self.styles['inline_attributes'] = ' '.join(sources['attrs'])
                 
-            # Extract computed styles for common elements
-            computed_styles = await page.evaluate('''
-                () => {
-                    const elements = document.querySelectorAll('body, h1, h2, h3, p, a, button, .logo, .header, .footer, .nav, .main, .container');
-                    const styles = {};
-                    elements.forEach((el, index) => {
-                        const computed = window.getComputedStyle(el);
-                        const important = [
-                            'color', 'background-color', 'font-family', 'font-size', 
-                            'font-weight', 'border-color', 'border-radius'
-                        ];
-                        const elementStyles = {};
-                        important.forEach(prop => {
-                            elementStyles[prop] = computed.getPropertyValue(prop);
-                        });
-                        styles[el.tagName.toLowerCase() + '_' + index] = elementStyles;
-                    });
-                    return styles;
-                }
-            ''')
-            
-            # Convert computed styles to CSS format
+            # Convert computed styles to CSS format, one column per property
+            computed = sources['computed']
+            selectors = computed.pop('selectors')
+            columns = list(computed.items())
             computed_css = []
-            for selector, props in computed_styles.items():
-                style_block = []
-                for prop, value in props.items():
-                    if value:
-                        style_block.append(f"{prop}: {value};")
+            for row, selector in enumerate(selectors):
+                style_block = [f"{prop}: {values[row]};" for prop, values in columns if values[row]]
                 if style_block:
                     computed_css.append(f"#{selector} {{ {' '.join(style_block)} }}")
             
@@ -284,67 +544,71 @@ class BrandExtractor:
             self.log(f"Error extracting CSS: {e}")
 
     def analyze_styles(self):
+        # extract_fonts and extract_colors both land here, only analyze once
+        if self._analyzed:
+            return
         if not self.styles:
             self.log("Warning: No styles were extracted. Style analysis may be incomplete.")
             return
+        self._analyzed = True
             
-        root_var_pattern = re.compile(r'--(.*?):\s*(.*?);')
-        font_pattern = re.compile(r'font-family:\s*([^;]+)')
-        color_pattern = re.compile(r'#([0-9a-fA-F]{3,6})')
-        rgb_pattern = re.compile(r'rgb\((\d+),\s*(\d+),\s*(\d+)\)')
-        rgba_pattern = re.compile(r'rgba\((\d+),\s*(\d+),\s*(\d+),\s*([0-9.]+)\)')
-        
+        # Join every source once so each pattern scans a single buffer. Style sources are
+        # already strings, anything else is skipped. The ';' keeps a declaration that is
+        # unterminated at the end of one source from running into the next one.
+        blob = ';\n'.join(content for content in self.styles.values() if isinstance(content, str))
+
         # Extract CSS variables from :root
-        for content in self.styles.values():
-            root_matches = re.findall(r':root\s*\{([^}]*)\}', str(content))
-            for block in root_matches:
-                for var, value in root_var_pattern.findall(block):
-                    self.css_variables[f"var(--{var.strip()})"] = value.strip()
-
-        # Extract fonts and colors
-        for style_content in self.styles.values():
-            # Process fonts
-            font_matches = font_pattern.findall(str(style_content))
-            for match in font_matches:
-                fonts = [f.strip().strip("'\"") for f in match.split(',')]
+        for block in ROOT_BLOCK_RE.findall(blob):
+            for var, value in ROOT_VAR_RE.findall(block):
+                self.css_variables[f"var(--{var.strip()})"] = value.strip()
+
+        # Extract fonts and colors in a single pass. Matches go into flat lists that are
+        # counted with one Counter.update each instead of a += 1 per match.
+        all_fonts = []
+        all_colors = []
+        rgb_channels = bytearray()
+        for match in STYLE_TOKEN_RE.finditer(blob):
+            kind = match.lastgroup
+            if kind == 'font':
+                fonts = [f.strip().strip("'\"") for f in match.group('font').split(',')]
                 for font in fonts:
-                    if font.lower() not in ['inherit', 'initial', 'unset', 'serif', 'sans-serif', 'monospace', 'cursive', 'fantasy']:
-                        if font.startswith('var('):
-                            font = self.css_variables.get(font, font)
-                        self.font_frequency[font] += 1
-                        self.fonts.add(font)
-
-            # Process hex colors
-            color_matches = color_pattern.findall(str(style_content))
-            for match in color_matches:
-                hex_code = match.lower()
+                    if font.lower() in GENERIC_FONTS:
+                        continue
+                    # Cheap first-character test before the startswith call
+                    if font[0] == 'v' and font.startswith('var('):
+                        font = self.css_variables.get(font, font)
+                    all_fonts.append(font)
+            elif kind == 'hex':
+                hex_code = match.group('hex').lower()
                 if len(hex_code) == 3:
-                    hex_code = ''.join([c * 2 for c in hex_code])
-                color = f'#{hex_code}'
-                self.color_frequency[color] += 1
-                self.colors.add(color)
-                
-            # Process RGB colors
-            rgb_matches = rgb_pattern.findall(str(style_content))
-            for r, g, b in rgb_matches:
+                    # Spelled out instead of a join over a list comprehension, this runs per match
+                    hex_code = hex_code[0] + hex_code[0] + hex_code[1] + hex_code[1] + hex_code[2] + hex_code[2]
+                all_colors.append(f'#{hex_code}')
+            else:
+                # RGB and RGBA channels are collected and converted to hex in one batch below
+                r, g, b = match.group(4, 5, 6) if match.group(4) else match.group(7, 8, 9)
                 r, g, b = int(r), int(g), int(b)
-                hex_color = f'#{r:02x}{g:02x}{b:02x}'
-                self.color_frequency[hex_color] += 1
-                self.colors.add(hex_color)
-                
-            # Process RGBA colors (convert to hex, ignoring alpha)
-            rgba_matches = rgba_pattern.findall(str(style_content))
-            for r, g, b, a in rgba_matches:
-                r, g, b = int(r), int(g), int(b)
-                hex_color = f'#{r:02x}{g:02x}{b:02x}'
-                self.color_frequency[hex_color] += 1
-                self.colors.add(hex_color)
+                if r < 256 and g < 256 and b < 256:
+                    rgb_channels.extend((r, g, b))
+
+        # bytes.hex() formats every channel at once, six hex digits per color (alpha is ignored)
+        rgb_hex = rgb_channels.hex()
+        all_colors.extend(['#' + rgb_hex[i:i + 6] for i in range(0, len(rgb_hex), 6)])
+
+        self.font_frequency.update(all_fonts)
+        self.fonts.update(all_fonts)
+        self.color_frequency.update(all_colors)
+        self.colors.update(all_colors)
+
+        # The Counters are final now, sort them once for every report and theme lookup
+        self._sorted_fonts = [font for font, _ in self.font_frequency.most_common()]
+        self._sorted_colors = [color for color, _ in self.color_frequency.most_common()]
 
     def get_top_fonts(self, limit=5):
-        return [font for font, _ in self.font_frequency.most_common(limit)]
+        return self._sorted_fonts[:limit]
 
     def get_top_colors(self, limit=5):
-        return [color for color, _ in self.color_frequency.most_common(limit)]
+        return self._sorted_colors[:limit]
 
     def extract_fonts(self):
         self.analyze_styles()
@@ -359,22 +623,38 @@ class BrandExtractor:
             'color_scheme': list(self.colors)
         }
 
+    def _load_logo_for_pdf(self):
+        """Return the logo as a PNG buffer no larger than LOGO_MAX_PX per side"""
+        with PILImage.open(self.logo_path) as logo:
+            logo.thumbnail((LOGO_MAX_PX, LOGO_MAX_PX))
+            # PNG cannot store modes such as CMYK (common in JPEG logos)
+            if logo.mode not in ('RGB', 'RGBA', 'L', 'LA', 'P'):
+                logo = logo.convert('RGB')
+            buffer = io.BytesIO()
+            logo.save(buffer, format='PNG')
+        buffer.seek(0)
+        return buffer
+
     def generate_pdf_report(self):
         os.makedirs(self.output_dir, exist_ok=True)
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f"{self.output_dir}/brand_report_{timestamp}.pdf"
 
-        primary_colors = self.get_top_colors(3)
-        secondary_colors = self.get_top_colors(6)[3:] if len(self.get_top_colors(6)) > 3 else []
+        # Slices of the lists sorted once in analyze_styles, empty when nothing was detected
+        top_colors = self.get_top_colors(6)
+        primary_colors = top_colors[:3]
+        secondary_colors = top_colors[3:]
         primary_fonts = self.get_top_fonts(3)
 
-        doc = SimpleDocTemplate(filename, pagesize=letter)
+        # Build in memory so callers can serve the bytes without reading the file back
+        buffer = io.BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=letter)
         styles = getSampleStyleSheet()
         story = []
 
         if self.logo_path:
             try:
-                story.append(Image(self.logo_path, width=1.5 * inch, height=1.5 * inch))
+                story.append(Image(self._load_logo_for_pdf(), width=1.5 * inch, height=1.5 * inch))
                 story.append(Spacer(1, 12))
             except Exception as e:
                 self.log(f"Error adding logo to PDF: {e}")
@@ -387,33 +667,23 @@ class BrandExtractor:
 
         # Create color swatches
         def create_color_table(colors):
-            if not colors:
-                return Table([["No colors detected"]])
-                
+            freq = self.color_frequency
             color_data = []
             color_data.append(["Color", "Hex Code", "Usage Count"])
+            # Swatches are the first column's cell backgrounds of this one table
+            swatch_styles = []
             
-            for color in colors:
+            for row, color in enumerate(colors, start=1):
                 try:
                     # Convert hex to ReportLab color
-                    hex_code = color.lstrip('#')
-                    r = int(hex_code[0:2], 16) / 255
-                    g = int(hex_code[2:4], 16) / 255
-                    b = int(hex_code[4:6], 16) / 255
-                    
-                    # Create a small color swatch
-                    color_box = Table([['']], colWidths=[0.3*inch], rowHeights=[0.3*inch])
-                    color_box.setStyle(TableStyle([
-                        ('BACKGROUND', (0, 0), (-1, -1), (r, g, b)),
-                        ('BOX', (0, 0), (-1, -1), 0.5, reportlab_colors.black),
-                    ]))
-                    
-                    color_data.append([color_box, color, str(self.color_frequency[color])])
+                    r, g, b = bytes.fromhex(color[1:])
+                    swatch_styles.append(('BACKGROUND', (0, row), (0, row), reportlab_colors.Color(r / 255, g / 255, b / 255)))
+                    color_data.append(['', color, f'{freq[color]}'])
                 except Exception as e:
                     self.log(f"Error creating swatch for color {color}: {e}")
-                    color_data.append(["Error", color, str(self.color_frequency[color])])
+                    color_data.append(["Error", color, f'{freq[color]}'])
             
-            table = Table(color_data)
+            table = Table(color_data, colWidths=[SWATCH_WIDTH, None, None])
             table.setStyle(TableStyle([
                 ('BACKGROUND', (0, 0), (-1, 0), reportlab_colors.grey),
                 ('TEXTCOLOR', (0, 0), (-1, 0), reportlab_colors.whitesmoke),
@@ -421,13 +691,14 @@ class BrandExtractor:
                 ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
                 ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
                 ('GRID', (0, 0), (-1, -1), 0.5, reportlab_colors.grey),
-            ]))
+            ] + swatch_styles))
             return table
 
         story.append(Paragraph("Typography", styles['Heading2']))
         story.append(Paragraph("Primary Fonts", styles['Heading3']))
         if primary_fonts:
-            font_data = [['Font', 'Usage Count']] + [[font, str(self.font_frequency[font])] for font in primary_fonts]
+            freq = self.font_frequency
+            font_data = [['Font', 'Usage Count']] + [[font, f'{freq[font]}'] for font in primary_fonts]
             font_table = Table(font_data)
             font_table.setStyle(TableStyle([
                 ('BACKGROUND', (0, 0), (-1, 0), reportlab_colors.grey),
@@ -444,7 +715,10 @@ class BrandExtractor:
 
         story.append(Paragraph("Color Palette", styles['Heading2']))
         story.append(Paragraph("Primary Colors", styles['Heading3']))
-        story.append(create_color_table(primary_colors))
+        if primary_colors:
+            story.append(create_color_table(primary_colors))
+        else:
+            story.append(Paragraph("No colors detected", styles['Normal']))
         story.append(Spacer(1, 12))
 
         if secondary_colors:
@@ -453,6 +727,9 @@ class BrandExtractor:
             story.append(Spacer(1, 12))
 
         doc.build(story)
+        self.pdf_bytes = buffer.getvalue()
+        with open(filename, 'wb') as f:
+            f.write(self.pdf_bytes)
 
         if self.auto_open:
             webbrowser.open(filename)
@@ -476,20 +753,25 @@ class BrandExtractor:
             'themes': self.themes,
             'stylesheets': list(self.styles.keys())
         }
-        with open(filename, 'w') as f:
-            json.dump(data, f, indent=2)
+        with open(filename, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
         return filename
 
     async def extract_branding(self):
+        # Without an injected client, one is created for this extraction only
+        owns_http = self._http is None
+        if owns_http:
+            self._http = create_http_client()
         try:
             self.log(f"Starting extraction for URL: {self.url}")
             if not await self.fetch_page():
                 self.log("Error: Failed to fetch page")
                 return None
             
+            # The logo keeps downloading while the styles are analyzed in a worker thread
             self.log("Starting font extraction...")
             try:
-                self.extract_fonts()
+                await asyncio.to_thread(self.extract_fonts)
                 self.log(f"Found {len(self.fonts)} fonts")
             except Exception as e:
                 self.log(f"Error extracting fonts: {str(e)}")
@@ -499,7 +781,7 @@ class BrandExtractor:
             
             self.log("Starting color extraction...")
             try:
-                self.extract_colors()
+                await asyncio.to_thread(self.extract_colors)
                 self.log(f"Found {len(self.colors)} colors")
             except Exception as e:
                 self.log(f"Error extracting colors: {str(e)}")
@@ -516,57 +798,141 @@ class BrandExtractor:
                     traceback.print_exc()
                 return None
             
-            self.log("Starting PDF report generation...")
-            try:
-                pdf_path = self.generate_pdf_report()
-                if not pdf_path:
-                    self.log("Error: PDF generation returned None")
-                    return None
-                self.log(f"PDF report generated at: {pdf_path}")
-            except Exception as e:
-                self.log(f"Error generating PDF report: {str(e)}")
-                if self.debug:
-                    traceback.print_exc()
-                return None
+            async def build_pdf():
+                # Only the PDF embeds the logo, the JSON report does not wait for it
+                if self._logo_task:
+                    await self._logo_task
+                return await asyncio.to_thread(self.generate_pdf_report)
             
-            self.log("Starting JSON report generation...")
-            try:
-                json_path = self.generate_json_report()
-                if not json_path:
-                    self.log("Error: JSON generation returned None")
+            # PDF layout and JSON serialization are independent, run both off the event loop
+            self.log("Starting PDF and JSON report generation...")
+            pdf_path, json_path = await asyncio.gather(
+                build_pdf(),
+                asyncio.to_thread(self.generate_json_report),
+                return_exceptions=True
+            )
+            for kind, path in (('PDF', pdf_path), ('JSON', json_path)):
+                if isinstance(path, Exception):
+                    self.log(f"Error generating {kind} report: {str(path)}")
+                    if self.debug:
+                        traceback.print_exception(path)
                     return None
-                self.log(f"JSON report generated at: {json_path}")
-            except Exception as e:
-                self.log(f"Error generating JSON report: {str(e)}")
-                if self.debug:
-                    traceback.print_exc()
-                return None
+                if not path:
+                    self.log(f"Error: {kind} generation returned None")
+                    return None
+                self.log(f"{kind} report generated at: {path}")
             
             self.log(f"Reports generated successfully: PDF={pdf_path}, JSON={json_path}")
-            return {'pdf': pdf_path, 'json': json_path}
+            return {'pdf': pdf_path, 'json': json_path, 'pdf_bytes': self.pdf_bytes}
         except Exception as e:
             self.log(f"Error in extract_branding: {str(e)}")
             if self.debug:
                 traceback.print_exc()
             return None
+        finally:
+            # Early returns leave the logo download running, stop it before the client closes
+            if self._logo_task and not self._logo_task.done():
+                self._logo_task.cancel()
+                await asyncio.gather(self._logo_task, return_exceptions=True)
+            if owns_http:
+                await self._http.aclose()
+                self._http = None
+
+# Event loop and HTTP client of a worker process, set by init_worker
+_worker = None
+
+def init_worker():
+    """Process pool initializer: start a loop, Chromium and an HTTP client for this worker"""
+    global _worker
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    loop.run_until_complete(_browser_pool.get())
+    _worker = types.SimpleNamespace(loop=loop, http_client=create_http_client())
+
+    def close_worker():
+        try:
+            loop.run_until_complete(_worker.http_client.aclose())
+            loop.run_until_complete(_browser_pool.close())
+        except Exception:
+            pass
+
+    atexit.register(close_worker)
+
+async def _extract_in_worker(url, output_dir, debug, fast_path):
+    html = None
+    final_url = None
+    if fast_path:
+        try:
+            response = await _worker.http_client.get(url)
+            if response.is_success:
+                html = response.text
+                # Redirects are followed, relative links resolve against where they ended
+                final_url = str(response.url)
+        except httpx.HTTPError:
+            pass
+    
+    extractor = BrandExtractor(url, output_dir, auto_open=False, debug=debug, browser=await _browser_pool.get(),
+                               precomputed_html=html, http_client=_worker.http_client, precomputed_url=final_url)
+    return await extractor.extract_branding()
+
+def extract_in_worker(url, output_dir, debug=False, fast_path=False, timeout=None):
+    """Run one extraction on the warm browser of a worker started with init_worker"""
+    return _worker.loop.run_until_complete(
+        asyncio.wait_for(_extract_in_worker(url, output_dir, debug, fast_path), timeout)
+    )
+
+async def scrape_many(urls, output_dir='reports', concurrency=8, debug=False, http_client=None):
+    """Extract several sites on the shared browser and HTTP client, at most concurrency at a time"""
+    semaphore = asyncio.Semaphore(concurrency)
+    owns_http = http_client is None
+    if owns_http:
+        http_client = create_http_client()
+
+    async def one(i, url):
+        # Reports are named by timestamp and the logo is always logo.png, so give each site its own directory
+        site_dir = os.path.join(output_dir, f"{i:03d}_{urlparse(url).netloc or 'site'}")
+        async with semaphore:
+            extractor = BrandExtractor(url, site_dir, auto_open=False, debug=debug, http_client=http_client)
+            return await extractor.extract_branding()
+
+    try:
+        return await asyncio.gather(*(one(i, url) for i, url in enumerate(urls)))
+    finally:
+        if owns_http:
+            await http_client.aclose()
+
+def read_urls_file(path):
+    """Read one URL per line, skipping blank lines and # comments"""
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
 
 def parse_arguments():
     parser = argparse.ArgumentParser(description='Extract branding information from a website.')
     parser.add_argument('--url', '-u', help='Website URL to analyze')
+    parser.add_argument('--urls-file', help='File with one website URL per line to analyze as a batch')
+    parser.add_argument('--concurrency', type=int, default=8, help='Sites analyzed at the same time with --urls-file')
     parser.add_argument('--output', '-o', help='Output directory for reports', default='reports')
     parser.add_argument('--open', action='store_true', help='Auto-open the generated PDF after completion')
     return parser.parse_args()
 
 async def main():
     args = parse_arguments()
+    if args.urls_file:
+        await main_batch(args)
+        return
+
     url = args.url
     if not url:
-        print("Error: URL is required")
+        print("Error: URL or --urls-file is required")
         sys.exit(1)
 
     print(f"\nAnalyzing website: {url}\nThis may take a few moments...")
-    extractor = BrandExtractor(url, args.output, auto_open=args.open)
-    result = await extractor.extract_branding()
+    try:
+        async with create_http_client() as http_client:
+            extractor = BrandExtractor(url, args.output, auto_open=args.open, http_client=http_client)
+            result = await extractor.extract_branding()
+    finally:
+        await _browser_pool.close()
     if result:
         print("\nReports generated:")
         print(f"PDF Report: {result['pdf']}")
@@ -574,6 +940,27 @@ async def main():
     else:
         print("Failed to analyze the website.")
 
+async def main_batch(args):
+    urls = read_urls_file(args.urls_file)
+    if args.url:
+        urls.insert(0, args.url)
+    if not urls:
+        print(f"Error: no URLs found in {args.urls_file}")
+        sys.exit(1)
+
+    print(f"\nAnalyzing {len(urls)} websites, {args.concurrency} at a time...")
+    try:
+        results = await scrape_many(urls, args.output, concurrency=max(1, args.concurrency))
+    finally:
+        await _browser_pool.close()
+    for url, result in zip(urls, results):
+        if result:
+            print(f"\n{url}\nPDF Report: {result['pdf']}\nJSON Report: {result['json']}")
+        else:
+            print(f"\n{url}\nFailed to analyze the website.")
+    if not any(results):
+        sys.exit(1)
+
 if __name__ == "__main__":
     try:
         asyncio.run(main())